@@ -7,20 +7,41 @@ Unlike keyword matching, this engine:
 4. Generates data-driven build ideas with real numbers interpolated
 """
 
+import heapq
 import logging
 import re
-from collections import Counter
+from collections import defaultdict
 from datetime import datetime, timezone
-from typing import Any
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Iterator, TypedDict
 
 log = logging.getLogger(__name__)
 
+# Stablecoins excluded when measuring stablecoin diversification
+MAJOR_STABLECOINS = frozenset({"USDC", "USDT"})
+
 
 # ─── Signal Extraction ──────────────────────────────────────────────
 
-def extract_github_signals(github: dict) -> list[dict]:
+class Signal(TypedDict):
+    """One piece of evidence extracted from a data source.
+
+    Kept as a plain dict so signals serialize straight into the API
+    responses and dashboard without conversion.
+    """
+    source: str
+    type: str
+    topic: str
+    metrics: dict[str, Any]
+    text: str
+    strength_raw: float
+
+
+def extract_github_signals(github: dict) -> list[Signal]:
     """Extract narrative signals from GitHub data."""
-    signals = []
+    signals: list[Signal] = []
 
     # From narrative probes — which search terms have the most activity
     for probe in github.get("narrative_probes", []):
@@ -47,7 +68,7 @@ def extract_github_signals(github: dict) -> list[dict]:
                 "topic": ", ".join(topics[:3]) if topics else desc[:60],
                 "metrics": {"stars": repo["stars"], "name": repo["name"]},
                 "text": f"New repo: {repo['name']} ({repo['stars']} stars) — {desc[:80]}",
-                "strength_raw": max(repo["stars"], 1),
+                "strength_raw": repo["stars"] or 1,
             })
 
     # From trending — what's getting the most attention
@@ -64,9 +85,9 @@ def extract_github_signals(github: dict) -> list[dict]:
     return signals
 
 
-def extract_defi_signals(defi: dict) -> list[dict]:
+def extract_defi_signals(defi: dict) -> list[Signal]:
     """Extract narrative signals from DeFi/on-chain data."""
-    signals = []
+    signals: list[Signal] = []
 
     # TVL trend — is capital flowing in or out?
     tvl = defi.get("tvl", {})
@@ -86,18 +107,19 @@ def extract_defi_signals(defi: dict) -> list[dict]:
     # Category analysis — which sectors are growing fastest
     protocols = defi.get("protocols", [])
     if protocols:
-        cat_data: dict[str, dict] = {}
+        cat_data: defaultdict[str, dict] = defaultdict(
+            lambda: {"tvl": 0, "change_sum": 0.0, "change_count": 0, "protocols": []}
+        )
         for p in protocols:
-            cat = p.get("category", "Other")
-            if cat not in cat_data:
-                cat_data[cat] = {"tvl": 0, "changes": [], "protocols": []}
-            cat_data[cat]["tvl"] += p.get("tvl_usd", 0)
+            d = cat_data[p.get("category", "Other")]
+            d["tvl"] += p.get("tvl_usd", 0)
             if c7 := p.get("change_7d_pct"):
-                cat_data[cat]["changes"].append(c7)
-            cat_data[cat]["protocols"].append(p["name"])
+                d["change_sum"] += c7
+                d["change_count"] += 1
+            d["protocols"].append(p["name"])
 
         for cat, d in sorted(cat_data.items(), key=lambda x: x[1]["tvl"], reverse=True):
-            avg_change = sum(d["changes"]) / len(d["changes"]) if d["changes"] else 0
+            avg_change = d["change_sum"] / d["change_count"] if d["change_count"] else 0
             if d["tvl"] > 5_000_000:  # >$5M TVL
                 signals.append({
                     "source": "defi",
@@ -111,7 +133,9 @@ def extract_defi_signals(defi: dict) -> list[dict]:
     # Fee revenue — the strongest signal for real usage
     fees = defi.get("fees", [])
     if fees:
-        total_fees_24h = sum(f.get("fees_24h", 0) for f in fees)
+        total_fees_24h = 0
+        for f in fees:
+            total_fees_24h += f.get("fees_24h") or 0
         growing = [f for f in fees if (f.get("change_7d_pct") or 0) > 10]
         signals.append({
             "source": "defi",
@@ -126,10 +150,10 @@ def extract_defi_signals(defi: dict) -> list[dict]:
     stables = defi.get("stablecoins", {})
     total_stable = stables.get("total_mcap_usd", 0)
     if total_stable > 1e9:
-        non_usdc_usdt = sum(
-            s["mcap_usd"] for s in stables.get("assets", [])
-            if s["symbol"] not in ("USDC", "USDT")
-        )
+        non_usdc_usdt = 0
+        for s in stables.get("assets", []):
+            if s["symbol"] not in MAJOR_STABLECOINS:
+                non_usdc_usdt += s["mcap_usd"]
         signals.append({
             "source": "defi",
             "type": "stablecoins",
@@ -156,15 +180,15 @@ def extract_defi_signals(defi: dict) -> list[dict]:
     return signals
 
 
-def extract_social_signals(social: dict) -> list[dict]:
+def extract_social_signals(social: dict) -> list[Signal]:
     """Extract narrative signals from social data."""
-    signals = []
+    signals: list[Signal] = []
 
     # Reddit engagement — what's the community talking about
     reddit_all = social.get("reddit", {}).get("solana", []) + social.get("reddit", {}).get("solanadev", [])
     if reddit_all:
         # Top posts by engagement
-        top_posts = sorted(reddit_all, key=lambda p: p.get("score", 0) + p.get("comments", 0), reverse=True)[:5]
+        top_posts = heapq.nlargest(5, reddit_all, key=lambda p: p.get("score", 0) + p.get("comments", 0))
         for post in top_posts:
             signals.append({
                 "source": "social",
@@ -178,10 +202,11 @@ def extract_social_signals(social: dict) -> list[dict]:
     # StackExchange — developer questions reveal what's being built
     se = social.get("stackexchange", [])
     if se:
-        tag_counts = Counter()
+        tag_counts: dict[str, int] = {}
         for q in se:
-            tag_counts.update(q.get("tags", []))
-        top_tags = tag_counts.most_common(10)
+            for tag in q.get("tags", ()):
+                tag_counts[tag] = tag_counts.get(tag, 0) + 1
+        top_tags = heapq.nlargest(10, tag_counts.items(), key=itemgetter(1))
         if top_tags:
             signals.append({
                 "source": "social",
@@ -207,6 +232,14 @@ def extract_social_signals(social: dict) -> list[dict]:
     return signals
 
 
+def extract_all_signals(github: dict, defi: dict, social: dict) -> list[Signal]:
+    """Extract signals from every source, in github → defi → social order."""
+    signals = extract_github_signals(github)
+    signals += extract_defi_signals(defi)
+    signals += extract_social_signals(social)
+    return signals
+
+
 # ─── Narrative Discovery ─────────────────────────────────────────────
 
 # Topic keywords that map signals to narrative themes.
@@ -231,48 +264,106 @@ KNOWN_THEMES = {
 }
 
 
+def _theme_pattern(keywords: list[str]) -> re.Pattern:
+    """Compile a theme's keywords into one alternation.
+
+    Only presence matters, so keywords that contain another keyword of the
+    same theme ("ai agent" vs "agent", "payment" vs "pay") are dropped.
+    """
+    keywords = [kw.lower() for kw in keywords]
+    needed = [kw for kw in keywords if not any(other != kw and other in kw for other in keywords)]
+    return re.compile("|".join(re.escape(kw) for kw in needed))
+
+
+# One compiled alternation per theme, so matching a signal is a single regex
+# scan per theme instead of a Python-level substring check per keyword.
+THEME_PATTERNS: list[tuple[str, re.Pattern]] = [
+    (name, _theme_pattern(keywords)) for name, keywords in KNOWN_THEMES.items()
+]
+# Any keyword of any theme — lets signals that match nothing exit after one scan
+_ANY_THEME_PATTERN = re.compile("|".join(pattern.pattern for _, pattern in THEME_PATTERNS))
+
+# Individual words of all theme keywords; bigrams using them are not "new" themes
+KNOWN_KEYWORD_WORDS = frozenset(
+    word for keywords in KNOWN_THEMES.values() for kw in keywords for word in re.findall(r"[a-z]+", kw.lower())
+)
+
+# Words too generic to name a theme — filtered before bigram counting.
+STOP_WORDS = frozenset({"the", "and", "for", "with", "that", "this", "from", "have", "are", "was", "how", "can",
+                       "you", "your", "what", "not", "but", "has", "any", "get", "use", "new", "all", "one",
+                       "solana", "sol", "token", "crypto", "blockchain", "web3", "program", "account",
+                       "bot", "trading", "open", "source", "arbitrage", "sniper", "copy", "volume",
+                       "github", "com", "http", "https", "npm", "install", "run", "build", "test",
+                       "based", "using", "built", "made", "simple", "fast", "smart", "best", "free",
+                       "chain", "bitcoin", "ethereum", "wallet", "protocol", "network", "transaction",
+                       "contract", "swap", "dapp", "defi", "nft", "api", "sdk", "cli", "rust",
+                       "typescript", "javascript", "python", "anchor", "client", "server", "data",
+                       "price", "market", "order", "transfer", "address", "key", "sign", "hash",
+                       "block", "validator", "node", "stake", "reward", "mint", "burn", "supply"})
+# Tokens of 3+ letters; shorter words never name a theme
+_WORD_RE = re.compile(r"[a-z]{3,}")
+
+
+@lru_cache(maxsize=4096)
+def _themes_for(signal_text: str) -> tuple[str, ...]:
+    """Names of the known themes whose keywords occur in a lowercased signal text."""
+    if not _ANY_THEME_PATTERN.search(signal_text):
+        return ()
+    return tuple(name for name, pattern in THEME_PATTERNS if pattern.search(signal_text))
+
+
 def _normalize_scores(values: list[float]) -> list[float]:
     """Min-max normalize to 0-100 scale."""
-    if not values or max(values) == min(values):
-        return [50.0] * len(values)
+    if not values:
+        return []
     mn, mx = min(values), max(values)
-    return [round((v - mn) / (mx - mn) * 100, 1) for v in values]
+    if mx == mn:
+        return [50.0] * len(values)
+    # Divide, then scale: multiplying by a hoisted 100 / span rounds differently
+    # at .x5 boundaries and shifts displayed scores by 0.1
+    span = mx - mn
+    return [round((v - mn) / span * 100, 1) for v in values]
 
 
-def discover_narratives(all_signals: list[dict], text_corpus: list[str]) -> list[dict]:
+def discover_narratives(all_signals: list[Signal], text_corpus: list[str]) -> list[dict]:
     """Discover and rank narratives from signals + text corpus.
 
     Two-pronged approach:
     1. Match signals to known themes (catches expected narratives)
     2. Extract frequent bigrams from text corpus (catches unexpected themes)
     """
-    # Phase 1: Theme matching
-    theme_signals: dict[str, list[dict]] = {name: [] for name in KNOWN_THEMES}
+    # Phase 1: Theme matching. Each theme accumulates its signals, sources
+    # and total strength as signals are matched, so scoring needs no second pass.
+    theme_acc: dict[str, dict] = {
+        name: {"signals": [], "sources": set(), "strength_sum": 0.0} for name in KNOWN_THEMES
+    }
 
     for signal in all_signals:
         signal_text = f"{signal.get('topic', '')} {signal.get('text', '')}".lower()
-        for theme_name, keywords in KNOWN_THEMES.items():
-            if any(kw in signal_text for kw in keywords):
-                theme_signals[theme_name].append(signal)
+        for theme_name in _themes_for(signal_text):
+            acc = theme_acc[theme_name]
+            acc["signals"].append(signal)
+            acc["sources"].add(signal["source"])
+            acc["strength_sum"] += signal.get("strength_raw", 0)
 
     # Phase 2: Text corpus bigram analysis for unknown themes
     unknown_signals = _discover_unknown_themes(text_corpus, all_signals)
 
     # Score themes
     narratives = []
-    for theme_name, signals in theme_signals.items():
+    for theme_name, acc in theme_acc.items():
+        signals = acc["signals"]
         if not signals:
             continue
 
         # Normalized scoring: each signal contributes its normalized strength
-        sources = list(set(s["source"] for s in signals))
-        raw_strengths = [s.get("strength_raw", 0) for s in signals]
+        sources = list(acc["sources"])
 
         # Source diversity bonus (multi-source corroboration is strong)
         diversity_multiplier = 1.0 + 0.4 * (len(sources) - 1)
 
         # Composite: average normalized strength × diversity × signal count factor
-        avg_strength = sum(raw_strengths) / len(raw_strengths) if raw_strengths else 0
+        avg_strength = acc["strength_sum"] / len(signals)
         signal_count_factor = min(len(signals) / 3, 2.0)  # Diminishing returns past 6 signals
         raw_score = avg_strength * diversity_multiplier * signal_count_factor
 
@@ -301,43 +392,27 @@ def discover_narratives(all_signals: list[dict], text_corpus: list[str]) -> list
     return narratives
 
 
-def _discover_unknown_themes(text_corpus: list[str], all_signals: list[dict]) -> list[dict]:
+def _discover_unknown_themes(text_corpus: list[str], all_signals: list[Signal]) -> list[dict]:
     """Analyze text corpus for emergent themes not in KNOWN_THEMES."""
     if not text_corpus:
         return []
 
-    # Extract significant bigrams
-    stop_words = {"the", "and", "for", "with", "that", "this", "from", "have", "are", "was", "how", "can",
-                  "you", "your", "what", "not", "but", "has", "any", "get", "use", "new", "all", "one",
-                  "solana", "sol", "token", "crypto", "blockchain", "web3", "program", "account",
-                  "bot", "trading", "open", "source", "arbitrage", "sniper", "copy", "volume",
-                  "github", "com", "http", "https", "npm", "install", "run", "build", "test",
-                  "based", "using", "built", "made", "simple", "fast", "smart", "best", "free",
-                  "chain", "bitcoin", "ethereum", "wallet", "protocol", "network", "transaction",
-                  "contract", "swap", "dapp", "defi", "nft", "api", "sdk", "cli", "rust",
-                  "typescript", "javascript", "python", "anchor", "client", "server", "data",
-                  "price", "market", "order", "transfer", "address", "key", "sign", "hash",
-                  "block", "validator", "node", "stake", "reward", "mint", "burn", "supply"}
-    bigram_counts: Counter = Counter()
+    # Extract significant bigrams (plain dict: cheaper per increment than Counter)
+    bigram_counts: dict[tuple[str, str], int] = {}
 
     for text in text_corpus:
-        words = re.findall(r"[a-z]+", text)
-        words = [w for w in words if w not in stop_words and len(w) > 2]
-        for i in range(len(words) - 1):
-            bigram_counts[(words[i], words[i + 1])] += 1
+        words = [w for w in _WORD_RE.findall(text.lower()) if w not in STOP_WORDS]
+        for key in zip(words, words[1:]):
+            bigram_counts[key] = bigram_counts.get(key, 0) + 1
 
     # Filter to significant bigrams (appear 3+ times)
-    significant = [(bg, count) for bg, count in bigram_counts.most_common(30) if count >= 3]
+    top_bigrams = heapq.nlargest(30, bigram_counts.items(), key=itemgetter(1))
+    significant = [(bg, count) for bg, count in top_bigrams if count >= 3]
 
     # Check which bigrams DON'T match any known theme
-    all_known_keywords = set()
-    for keywords in KNOWN_THEMES.values():
-        for kw in keywords:
-            all_known_keywords.update(re.findall(r"[a-z]+", kw.lower()))
-
     unknown_themes = []
     for (w1, w2), count in significant:
-        if w1 not in all_known_keywords and w2 not in all_known_keywords:
+        if w1 not in KNOWN_KEYWORD_WORDS and w2 not in KNOWN_KEYWORD_WORDS:
             theme_name = f"{w1.title()} {w2.title()} (Emerging)"
             unknown_themes.append({
                 "name": theme_name,
@@ -356,6 +431,116 @@ def _discover_unknown_themes(text_corpus: list[str], all_signals: list[dict]) ->
 
 # ─── Build Idea Generation ────────────────────────────────────────────
 
+# Idea templates keyed by narrative theme. Descriptions carry str.format
+# placeholders that are filled from live DeFi data only for the templates
+# actually selected.
+IDEA_TEMPLATES: dict[str, list[dict]] = {
+    "AI & Autonomous Agents": [
+        {
+            "title": "Multi-Agent DeFi Strategy Orchestrator",
+            "description": "A framework where specialized AI agents (risk assessor, yield optimizer, rebalancer) coordinate to manage DeFi positions across {top_protocols}. With {tvl_str} Solana TVL and {dex_vol} daily DEX volume, autonomous portfolio management has a massive addressable market. Each agent operates independently but shares a common state via on-chain accounts.",
+            "solana_stack": "Anchor programs for agent state, Jupiter CPI for swaps, Pyth for price feeds, Jito bundles for MEV-protected execution",
+            "target_users": "DeFi power users, fund managers, DAOs with treasuries",
+        },
+    ],
+    "Privacy & Confidential Transfers": [
+        {
+            "title": "Privacy-First Payroll & Treasury Tool",
+            "description": "Enterprise treasury management on Solana using Token-2022 confidential transfers. Companies can pay salaries, manage budgets, and settle invoices without revealing amounts on-chain. With {stable_str} in stablecoins on Solana, the payment infrastructure exists — what's missing is the privacy layer that enterprises require.",
+            "solana_stack": "Token-2022 confidential transfer extension, SPL Token program, Solana Pay for merchant settlement",
+            "target_users": "Companies, DAOs, payroll providers, accounting firms",
+        },
+    ],
+    "Stablecoin & PayFi Expansion": [
+        {
+            "title": "Multi-Stablecoin Payment Router",
+            "description": "An intelligent payment routing layer that accepts any stablecoin ({stable_symbols}) and settles in the recipient's preferred denomination. With {stable_str} stablecoin supply diversifying beyond USDC/USDT, merchants need a unified acceptance layer. Auto-routes through {top_dex} for optimal conversion.",
+            "solana_stack": "Jupiter swap CPI, Solana Pay protocol, Token-2022 transfer hooks for automatic conversion",
+            "target_users": "E-commerce merchants, POS systems, cross-border payment platforms",
+        },
+    ],
+    "DePIN & Physical Infrastructure": [
+        {
+            "title": "DePIN Revenue Analytics & Staking Optimizer",
+            "description": "A unified dashboard and optimization engine across all Solana DePIN networks (Helium, Hivemapper, Render). Tracks node economics, reward rates, and ROI. With DePIN generating $150M+ monthly revenue, operators need data-driven tools to allocate capital across networks for maximum yield.",
+            "solana_stack": "On-chain reads from Helium/Render programs, Pyth for token pricing, staking optimization via SPL Stake Pool",
+            "target_users": "DePIN node operators, hardware investors, yield analysts",
+        },
+    ],
+    "Liquid Staking & Restaking": [
+        {
+            "title": "LST Yield Aggregator with Auto-Routing",
+            "description": "One-click SOL staking that automatically routes to the highest-yield liquid staking token (mSOL, jitoSOL, bSOL) via Sanctum, then deploys the LST into the best-performing lending/LP position across {top_protocols}. Rebalances weekly based on yield changes.",
+            "solana_stack": "Sanctum router for LST swaps, CPI into lending protocols (Kamino, MarginFi), Jito stake pool",
+            "target_users": "Passive SOL holders, institutional stakers",
+        },
+    ],
+    "Real World Assets (RWA)": [
+        {
+            "title": "RWA Compliance Toolkit for Token-2022",
+            "description": "A no-code platform for issuing compliant tokenized securities on Solana using Token-2022 extensions. Includes KYC-gated transfers (transfer hooks), dividend distribution, and regulatory reporting. With {tvl_str} DeFi TVL proving Solana's financial infrastructure, RWA issuance is the next frontier.",
+            "solana_stack": "Token-2022: transfer hooks for KYC gates, permanent delegate for freeze authority, metadata extension for asset details",
+            "target_users": "Asset managers, real estate tokenizers, fund administrators",
+        },
+    ],
+    "ZK Compression & Scalability": [
+        {
+            "title": "Compressed Token Airdrop & Distribution Platform",
+            "description": "Mass token distribution at 1/1000th the cost using ZK Compression. Enables airdrops to millions of wallets, loyalty reward programs, and community token distributions that were previously cost-prohibitive. A single compressed airdrop to 1M wallets costs ~$50 vs ~$50,000 with regular accounts.",
+            "solana_stack": "Light Protocol ZK Compression, compressed token accounts, concurrent Merkle trees",
+            "target_users": "Token projects launching airdrops, loyalty programs, marketing campaigns",
+        },
+    ],
+    "Infrastructure & Validators": [
+        {
+            "title": "Firedancer Migration Health Monitor",
+            "description": "A real-time dashboard tracking Firedancer adoption across the validator set — stake distribution, block production quality, skip rates, and latency improvements. With Firedancer crossing 20% stake and Alpenglow promising 150ms finality, validators and delegators need visibility into the transition's impact on network performance.",
+            "solana_stack": "Solana RPC for validator metrics, gossip protocol monitoring, epoch-level performance tracking",
+            "target_users": "Validators, stake delegators, infrastructure teams",
+        },
+    ],
+    "Perpetuals & Derivatives": [
+        {
+            "title": "On-Chain Derivatives Analytics Terminal",
+            "description": "A Bloomberg-style terminal for Solana perpetuals and options. Aggregates data from Drift, Zeta, Phoenix — showing funding rates, open interest, liquidation levels, and basis trades. With {dex_vol} daily DEX volume driving demand for sophisticated trading tools, there's a gap for on-chain derivatives intelligence.",
+            "solana_stack": "Read Drift/Zeta program accounts, Pyth for mark prices, Clockwork for scheduled data snapshots",
+            "target_users": "Professional traders, market makers, hedge funds",
+        },
+    ],
+}
+
+# Themes that have build-idea templates, in fallback priority order.
+IDEA_THEMES = tuple(IDEA_TEMPLATES)
+
+# Distinctive words of each theme name, for fuzzy-matching narratives
+# (e.g. discovered ones) onto a template.
+_IDEA_THEME_KEYWORDS: tuple[tuple[str, tuple[str, ...]], ...] = tuple(
+    (theme, tuple(w for w in theme.lower().split() if len(w) > 3))
+    for theme in IDEA_THEMES
+)
+
+
+def _match_idea_theme(name: str) -> str | None:
+    """Template theme for a narrative: exact name match, then fuzzy keyword match."""
+    if name in IDEA_TEMPLATES:
+        return name
+    name_lower = name.lower()
+    return next(
+        (theme for theme, key_words in _IDEA_THEME_KEYWORDS if any(w in name_lower for w in key_words)),
+        None,
+    )
+
+
+def _render_idea(template: dict, ctx: dict, narrative: str, score: float, signal_count: int) -> dict:
+    """Fill a template's description from ctx and tie it to a narrative."""
+    idea = template.copy()
+    idea["description"] = template["description"].format_map(ctx)
+    idea["tied_narrative"] = narrative
+    idea["narrative_score"] = score
+    idea["signal_count"] = signal_count
+    return idea
+
+
 def generate_ideas(narratives: list[dict], defi_data: dict) -> list[dict]:
     """Generate build ideas dynamically from actual narrative data.
 
@@ -373,140 +558,39 @@ def generate_ideas(narratives: list[dict], defi_data: dict) -> list[dict]:
     tvl_str = f"${defi_data.get('tvl', {}).get('current_usd', 0) / 1e9:.1f}B"
     stable_str = f"${stables.get('total_mcap_usd', 0) / 1e9:.1f}B"
     dex_vol = f"${dex.get('total_24h_usd', 0) / 1e6:.0f}M"
-
-    # Idea templates keyed by narrative theme — with data placeholders
-    idea_templates: dict[str, list[dict]] = {
-        "AI & Autonomous Agents": [
-            {
-                "title": "Multi-Agent DeFi Strategy Orchestrator",
-                "description": f"A framework where specialized AI agents (risk assessor, yield optimizer, rebalancer) coordinate to manage DeFi positions across {', '.join(top_protocols[:3])}. With {tvl_str} Solana TVL and {dex_vol} daily DEX volume, autonomous portfolio management has a massive addressable market. Each agent operates independently but shares a common state via on-chain accounts.",
-                "solana_stack": "Anchor programs for agent state, Jupiter CPI for swaps, Pyth for price feeds, Jito bundles for MEV-protected execution",
-                "target_users": "DeFi power users, fund managers, DAOs with treasuries",
-            },
-        ],
-        "Privacy & Confidential Transfers": [
-            {
-                "title": "Privacy-First Payroll & Treasury Tool",
-                "description": f"Enterprise treasury management on Solana using Token-2022 confidential transfers. Companies can pay salaries, manage budgets, and settle invoices without revealing amounts on-chain. With {stable_str} in stablecoins on Solana, the payment infrastructure exists — what's missing is the privacy layer that enterprises require.",
-                "solana_stack": "Token-2022 confidential transfer extension, SPL Token program, Solana Pay for merchant settlement",
-                "target_users": "Companies, DAOs, payroll providers, accounting firms",
-            },
-        ],
-        "Stablecoin & PayFi Expansion": [
-            {
-                "title": "Multi-Stablecoin Payment Router",
-                "description": f"An intelligent payment routing layer that accepts any stablecoin ({', '.join(s['symbol'] for s in stables.get('assets', [])[:4])}) and settles in the recipient's preferred denomination. With {stable_str} stablecoin supply diversifying beyond USDC/USDT, merchants need a unified acceptance layer. Auto-routes through {top_dexes[0]} for optimal conversion.",
-                "solana_stack": "Jupiter swap CPI, Solana Pay protocol, Token-2022 transfer hooks for automatic conversion",
-                "target_users": "E-commerce merchants, POS systems, cross-border payment platforms",
-            },
-        ],
-        "DePIN & Physical Infrastructure": [
-            {
-                "title": "DePIN Revenue Analytics & Staking Optimizer",
-                "description": f"A unified dashboard and optimization engine across all Solana DePIN networks (Helium, Hivemapper, Render). Tracks node economics, reward rates, and ROI. With DePIN generating $150M+ monthly revenue, operators need data-driven tools to allocate capital across networks for maximum yield.",
-                "solana_stack": "On-chain reads from Helium/Render programs, Pyth for token pricing, staking optimization via SPL Stake Pool",
-                "target_users": "DePIN node operators, hardware investors, yield analysts",
-            },
-        ],
-        "Liquid Staking & Restaking": [
-            {
-                "title": "LST Yield Aggregator with Auto-Routing",
-                "description": f"One-click SOL staking that automatically routes to the highest-yield liquid staking token (mSOL, jitoSOL, bSOL) via Sanctum, then deploys the LST into the best-performing lending/LP position across {', '.join(top_protocols[:3])}. Rebalances weekly based on yield changes.",
-                "solana_stack": "Sanctum router for LST swaps, CPI into lending protocols (Kamino, MarginFi), Jito stake pool",
-                "target_users": "Passive SOL holders, institutional stakers",
-            },
-        ],
-        "Real World Assets (RWA)": [
-            {
-                "title": "RWA Compliance Toolkit for Token-2022",
-                "description": f"A no-code platform for issuing compliant tokenized securities on Solana using Token-2022 extensions. Includes KYC-gated transfers (transfer hooks), dividend distribution, and regulatory reporting. With {tvl_str} DeFi TVL proving Solana's financial infrastructure, RWA issuance is the next frontier.",
-                "solana_stack": "Token-2022: transfer hooks for KYC gates, permanent delegate for freeze authority, metadata extension for asset details",
-                "target_users": "Asset managers, real estate tokenizers, fund administrators",
-            },
-        ],
-        "ZK Compression & Scalability": [
-            {
-                "title": "Compressed Token Airdrop & Distribution Platform",
-                "description": "Mass token distribution at 1/1000th the cost using ZK Compression. Enables airdrops to millions of wallets, loyalty reward programs, and community token distributions that were previously cost-prohibitive. A single compressed airdrop to 1M wallets costs ~$50 vs ~$50,000 with regular accounts.",
-                "solana_stack": "Light Protocol ZK Compression, compressed token accounts, concurrent Merkle trees",
-                "target_users": "Token projects launching airdrops, loyalty programs, marketing campaigns",
-            },
-        ],
-        "Infrastructure & Validators": [
-            {
-                "title": "Firedancer Migration Health Monitor",
-                "description": "A real-time dashboard tracking Firedancer adoption across the validator set — stake distribution, block production quality, skip rates, and latency improvements. With Firedancer crossing 20% stake and Alpenglow promising 150ms finality, validators and delegators need visibility into the transition's impact on network performance.",
-                "solana_stack": "Solana RPC for validator metrics, gossip protocol monitoring, epoch-level performance tracking",
-                "target_users": "Validators, stake delegators, infrastructure teams",
-            },
-        ],
-        "Perpetuals & Derivatives": [
-            {
-                "title": "On-Chain Derivatives Analytics Terminal",
-                "description": f"A Bloomberg-style terminal for Solana perpetuals and options. Aggregates data from Drift, Zeta, Phoenix — showing funding rates, open interest, liquidation levels, and basis trades. With {dex_vol} daily DEX volume driving demand for sophisticated trading tools, there's a gap for on-chain derivatives intelligence.",
-                "solana_stack": "Read Drift/Zeta program accounts, Pyth for mark prices, Clockwork for scheduled data snapshots",
-                "target_users": "Professional traders, market makers, hedge funds",
-            },
-        ],
+    ctx = {
+        "top_protocols": ", ".join(top_protocols[:3]),
+        "top_dex": top_dexes[0],
+        "tvl_str": tvl_str,
+        "stable_str": stable_str,
+        "stable_symbols": ", ".join(s["symbol"] for s in stables.get("assets", [])[:4]),
+        "dex_vol": dex_vol,
     }
 
-    ideas = []
-    used_templates = set()
-
-    # First pass: match top narratives to templates
-    for narrative in narratives:
-        if len(ideas) >= 5:
-            break
-        name = narrative["name"]
-
-        # Exact match
-        matched_key = None
-        for template_key in idea_templates:
-            if template_key == name:
-                matched_key = template_key
-                break
-
-        # Fuzzy match on keywords
-        if not matched_key:
-            name_lower = name.lower()
-            for template_key in idea_templates:
-                key_words = [w for w in template_key.lower().split() if len(w) > 3]
-                if any(w in name_lower for w in key_words):
-                    matched_key = template_key
-                    break
-
-        if matched_key and matched_key not in used_templates:
-            used_templates.add(matched_key)
-            for template in idea_templates[matched_key]:
-                ideas.append({
-                    **template,
-                    "tied_narrative": name,
-                    "narrative_score": narrative.get("score", 0),
-                    "signal_count": narrative.get("signal_count", 0),
-                })
-
-    # Second pass: fill remaining slots from unused templates (ordered by template importance)
-    if len(ideas) < 5:
-        priority_order = [
-            "AI & Autonomous Agents", "Privacy & Confidential Transfers",
-            "Stablecoin & PayFi Expansion", "DePIN & Physical Infrastructure",
-            "Liquid Staking & Restaking", "Real World Assets (RWA)",
-            "ZK Compression & Scalability", "Infrastructure & Validators",
-            "Perpetuals & Derivatives",
-        ]
-        for key in priority_order:
-            if key not in used_templates and key in idea_templates:
+    def candidates() -> Iterator[dict]:
+        used_templates = set()
+
+        # First: templates matching the top narratives, in rank order
+        for narrative in narratives:
+            name = narrative["name"]
+            matched_key = _match_idea_theme(name)
+            if matched_key and matched_key not in used_templates:
+                used_templates.add(matched_key)
+                for template in IDEA_TEMPLATES[matched_key]:
+                    yield _render_idea(
+                        template, ctx, name, narrative.get("score", 0), narrative.get("signal_count", 0),
+                    )
+
+        # Then: remaining templates, ordered by template importance
+        for key in IDEA_THEMES:
+            if key not in used_templates:
                 used_templates.add(key)
-                for template in idea_templates[key]:
-                    # Find the matching narrative if it exists
-                    tied = next((n for n in narratives if n["name"] == key), None)
-                    ideas.append({
-                        **template,
-                        "tied_narrative": key,
-                        "narrative_score": tied["score"] if tied else 0,
-                        "signal_count": tied["signal_count"] if tied else 0,
-                    })
-                if len(ideas) >= 5:
-                    break
-
-    return ideas[:5]
+                # Find the matching narrative if it exists
+                tied = next((n for n in narratives if n["name"] == key), None)
+                for template in IDEA_TEMPLATES[key]:
+                    yield _render_idea(
+                        template, ctx, key, tied["score"] if tied else 0, tied["signal_count"] if tied else 0,
+                    )
+
+    # Only the first five candidates are ever rendered
+    return list(islice(candidates(), 5))
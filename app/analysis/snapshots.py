@@ -7,19 +7,21 @@ current narratives to the most recent snapshot to detect:
 - Fading narratives (score decreased)
 """
 
-import json
+import heapq
 import logging
+import os
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+import orjson
+
 from app.config import DATA_DIR
 
 log = logging.getLogger(__name__)
 SNAPSHOT_DIR = DATA_DIR / "snapshots"
 SNAPSHOT_DIR.mkdir(exist_ok=True)
 
-
 def save_snapshot(narratives: list[dict], ideas: list[dict]) -> str:
     """Save current analysis as a timestamped snapshot."""
     ts = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
@@ -33,19 +35,30 @@ def save_snapshot(narratives: list[dict], ideas: list[dict]) -> str:
         "idea_count": len(ideas),
     }
     path = SNAPSHOT_DIR / f"snapshot_{ts}.json"
-    path.write_text(json.dumps(snapshot, indent=2))
+    path.write_bytes(orjson.dumps(snapshot, option=orjson.OPT_INDENT_2))
     log.info(f"Saved snapshot: {path.name}")
     return str(path)
 
 
+def _latest_snapshot_names() -> list[str]:
+    """Newest two snapshot filenames, newest first.
+
+    Filenames embed a sortable timestamp, so the newest are simply the
+    lexicographically largest.
+    """
+    with os.scandir(SNAPSHOT_DIR) as entries:
+        names = [e.name for e in entries if e.name.startswith("snapshot_") and e.name.endswith(".json")]
+    return heapq.nlargest(2, names)
+
+
 def load_previous_snapshot() -> dict | None:
     """Load the most recent snapshot for comparison."""
-    snapshots = sorted(SNAPSHOT_DIR.glob("snapshot_*.json"))
-    if len(snapshots) < 2:
+    latest = _latest_snapshot_names()
+    if len(latest) < 2:
         return None
     # Return second-to-last (the last one is the current run)
     try:
-        return json.loads(snapshots[-2].read_text())
+        return orjson.loads((SNAPSHOT_DIR / latest[1]).read_bytes())
     except Exception:
         return None
 
@@ -55,17 +68,17 @@ def compute_deltas(current: list[dict], previous: dict | None) -> list[dict]:
     if not previous:
         return [{"name": n["name"], "delta": "new", "score_change": 0} for n in current]
 
-    prev_scores = {n["name"]: n.get("score", 0) for n in previous.get("narratives", [])}
-    prev_names = set(prev_scores.keys())
+    prev_scores = {n["name"]: n.get("score") or 0 for n in previous.get("narratives", [])}
 
     deltas = []
     for n in current:
         name = n["name"]
         curr_score = n.get("score", 0)
-        if name not in prev_names:
+        prev_score = prev_scores.get(name)
+        if prev_score is None:
             deltas.append({"name": name, "delta": "new", "score_change": curr_score})
         else:
-            change = curr_score - prev_scores[name]
+            change = curr_score - prev_score
             if change > 5:
                 delta_label = "rising"
             elif change < -5:
@@ -75,3 +88,12 @@ def compute_deltas(current: list[dict], previous: dict | None) -> list[dict]:
             deltas.append({"name": name, "delta": delta_label, "score_change": round(change, 1)})
 
     return deltas
+
+
+def apply_deltas(narratives: list[dict], deltas: list[dict]) -> None:
+    """Attach delta label and score change to each narrative in place."""
+    delta_map = {d["name"]: d for d in deltas}
+    for n in narratives:
+        d = delta_map.get(n["name"], {})
+        n["delta"] = d.get("delta", "new")
+        n["score_change"] = d.get("score_change", 0)
@@ -9,28 +9,70 @@ DeFiLlama is free, no auth, and comprehensive. We use it for:
 """
 
 import asyncio
+import heapq
 import logging
-from datetime import datetime, timezone
-from typing import Any
+import sys
+import time
+from typing import Any, Awaitable
 
 import httpx
+import orjson
 
-from app.config import SOLANA_RPC
+from app.collectors.http import get_client, get_with_retry
+from app.config import SOLANA_RPC, UPSTREAM_CACHE_TTL_SECONDS
 
 log = logging.getLogger(__name__)
 
 LLAMA = "https://api.llama.fi"
 
 
-async def _get(client: httpx.AsyncClient, url: str, timeout: float = 30) -> Any:
+def _usd(amount: float | None) -> int:
+    """Whole-dollar amount from a non-negative USD figure; null counts as 0."""
+    return int(amount + 0.5) if amount else 0
+
+
+# url -> (monotonic fetch time, decoded body)
+_response_cache: dict[str, tuple[float, Any]] = {}
+_LARGE_BODY_BYTES = 1 << 20
+# Timing for DeFiLlama fetches, innermost first. httpx's read timeout bounds each
+# socket read (not the whole multi-MB body), so a stalled attempt costs at most
+# connect + read. _get's fetch budget covers every attempt plus retry backoff, and
+# the per-source budget in collect adds headroom for decoding on top of that.
+_LLAMA_TIMEOUT = httpx.Timeout(5.0, connect=2.0)
+_LLAMA_TRIES = 2
+_FETCH_BUDGET = _LLAMA_TRIES * (5.0 + 2.0) + 1.5
+_SOURCE_BUDGET = _FETCH_BUDGET + 2
+
+
+async def _get(
+    client: httpx.AsyncClient, url: str, timeout: httpx.Timeout = _LLAMA_TIMEOUT, budget: float = _FETCH_BUDGET,
+) -> Any:
+    """GET a DeFiLlama endpoint, reusing responses younger than the cache TTL.
+
+    The refetch runs under its own `budget` (shorter than the per-source budget
+    in collect), so a slow or failed refetch still returns the last good response.
+    """
+    cached = _response_cache.get(url)
+    if cached and time.monotonic() - cached[0] < UPSTREAM_CACHE_TTL_SECONDS:
+        return cached[1]
     try:
-        resp = await client.get(url, timeout=timeout)
-        if resp.status_code == 200:
-            return resp.json()
-        log.warning(f"DeFiLlama {resp.status_code}: {url}")
+        async with asyncio.timeout(budget):
+            resp = await get_with_retry(client, url, max_tries=_LLAMA_TRIES, timeout=timeout)
+            if resp.status_code == 200:
+                body = resp.content
+                # Multi-MB bodies (e.g. /protocols) are decoded off the event loop
+                if len(body) > _LARGE_BODY_BYTES:
+                    data = await asyncio.to_thread(orjson.loads, body)
+                else:
+                    data = orjson.loads(body)
+                _response_cache[url] = (time.monotonic(), data)
+                return data
+            log.warning(f"DeFiLlama {resp.status_code}: {url}")
+    except TimeoutError:
+        log.warning(f"DeFiLlama timed out after {budget}s: {url}")
     except Exception as e:
         log.warning(f"DeFiLlama failed ({url}): {type(e).__name__}: {e}")
-    return None
+    return cached[1] if cached else None
 
 
 async def get_tvl_history(client: httpx.AsyncClient) -> dict:
@@ -42,11 +84,11 @@ async def get_tvl_history(client: httpx.AsyncClient) -> dict:
     prev = recent[0]["tvl"] if recent else 0
     change = round(((current - prev) / max(prev, 1)) * 100, 2)
     return {
-        "current_usd": round(current),
-        "prev_14d_usd": round(prev),
+        "current_usd": _usd(current),
+        "prev_14d_usd": _usd(prev),
         "change_14d_pct": change,
         "daily": [
-            {"date": datetime.fromtimestamp(d["date"], tz=timezone.utc).strftime("%Y-%m-%d"), "tvl": round(d["tvl"])}
+            {"date": time.strftime("%Y-%m-%d", time.gmtime(d["date"])), "tvl": _usd(d["tvl"])}
             for d in recent
         ],
     }
@@ -57,18 +99,19 @@ async def get_protocols(client: httpx.AsyncClient) -> list[dict]:
     data = await _get(client, f"{LLAMA}/protocols")
     if not data:
         return []
-    solana = [p for p in data if "Solana" in (p.get("chains") or [])]
-    solana.sort(key=lambda p: p.get("tvl", 0), reverse=True)
+    solana = (p for p in data if p.get("chains") and "Solana" in p["chains"])
+    top = heapq.nlargest(30, solana, key=lambda p: p.get("tvl") or 0)
     return [
         {
             "name": p.get("name", ""),
-            "category": p.get("category", ""),
-            "tvl_usd": round(p.get("tvl", 0)),
+            # Interned: categories repeat across protocols and are used as dict keys downstream
+            "category": sys.intern(p.get("category") or ""),
+            "tvl_usd": _usd(p.get("tvl")),
             "change_1d_pct": round(p.get("change_1d") or 0, 2),
             "change_7d_pct": round(p.get("change_7d") or 0, 2),
             "slug": p.get("slug", ""),
         }
-        for p in solana[:30]
+        for p in top
     ]
 
 
@@ -77,16 +120,15 @@ async def get_fees(client: httpx.AsyncClient) -> list[dict]:
     data = await _get(client, f"{LLAMA}/overview/fees/solana?excludeTotalDataChart=true&excludeTotalDataChartBreakdown=true")
     if not data:
         return []
-    protocols = data.get("protocols", [])
-    protocols.sort(key=lambda p: p.get("total24h") or 0, reverse=True)
+    protocols = heapq.nlargest(20, data.get("protocols", []), key=lambda p: p.get("total24h") or 0)
     return [
         {
             "name": p.get("name", ""),
-            "fees_24h": round(p.get("total24h") or 0),
-            "fees_7d": round(p.get("total7d") or 0),
+            "fees_24h": _usd(p.get("total24h")),
+            "fees_7d": _usd(p.get("total7d")),
             "change_7d_pct": round(p.get("change_7d") or 0, 2),
         }
-        for p in protocols[:20]
+        for p in protocols
         if (p.get("total24h") or 0) > 0
     ]
 
@@ -97,20 +139,20 @@ async def get_dex_volumes(client: httpx.AsyncClient) -> dict:
         return {}
     total_24h = data.get("total24h", 0)
     total_7d = data.get("total7d", 0)
-    protocols = sorted(data.get("protocols", []), key=lambda p: p.get("total24h") or 0, reverse=True)
+    protocols = heapq.nlargest(10, data.get("protocols", []), key=lambda p: p.get("total24h") or 0)
     return {
-        "total_24h_usd": round(total_24h),
-        "total_7d_usd": round(total_7d),
+        "total_24h_usd": _usd(total_24h),
+        "total_7d_usd": _usd(total_7d),
         "change_7d_pct": round(data.get("change_7d") or 0, 2),
         "top_dexes": [
-            {"name": p.get("name", ""), "volume_24h": round(p.get("total24h") or 0), "change_7d_pct": round(p.get("change_7d") or 0, 2)}
-            for p in protocols[:10]
+            {"name": p.get("name", ""), "volume_24h": _usd(p.get("total24h")), "change_7d_pct": round(p.get("change_7d") or 0, 2)}
+            for p in protocols
         ],
     }
 
 
 async def get_stablecoins(client: httpx.AsyncClient) -> dict:
-    data = await _get(client, "https://stablecoins.llama.fi/stablecoins?includePrices=true", timeout=45)
+    data = await _get(client, "https://stablecoins.llama.fi/stablecoins")
     if not data:
         return {}
     assets = data.get("peggedAssets", [])
@@ -120,10 +162,9 @@ async def get_stablecoins(client: httpx.AsyncClient) -> dict:
         if "Solana" in chains:
             mcap = chains["Solana"].get("current", {}).get("peggedUSD", 0)
             if mcap > 0:
-                solana_stables.append({"name": s.get("name", ""), "symbol": s.get("symbol", ""), "mcap_usd": round(mcap)})
-    solana_stables.sort(key=lambda x: x["mcap_usd"], reverse=True)
+                solana_stables.append({"name": s.get("name", ""), "symbol": s.get("symbol", ""), "mcap_usd": _usd(mcap)})
     total = sum(s["mcap_usd"] for s in solana_stables)
-    return {"total_mcap_usd": round(total), "assets": solana_stables[:10]}
+    return {"total_mcap_usd": total, "assets": heapq.nlargest(10, solana_stables, key=lambda x: x["mcap_usd"])}
 
 
 async def get_bridge_flows(client: httpx.AsyncClient) -> dict:
@@ -138,17 +179,26 @@ async def get_bridge_flows(client: httpx.AsyncClient) -> dict:
     return {}
 
 
+# One JSON-RPC batch: the node answers every call in a single round trip.
+# The payload never changes, so it is serialized once at import.
+_NETWORK_RPC_BATCH = orjson.dumps([
+    {"jsonrpc": "2.0", "id": 1, "method": "getRecentPerformanceSamples", "params": [10]},
+    {"jsonrpc": "2.0", "id": 2, "method": "getSupply"},
+])
+
+
 async def get_solana_network(client: httpx.AsyncClient) -> dict:
     """Basic Solana network stats from RPC."""
     try:
-        perf_resp = await client.post(SOLANA_RPC, json={"jsonrpc": "2.0", "id": 1, "method": "getRecentPerformanceSamples", "params": [10]})
-        samples = perf_resp.json().get("result", [])
+        resp = await client.post(SOLANA_RPC, content=_NETWORK_RPC_BATCH, headers={"Content-Type": "application/json"})
+        results = {r.get("id"): r.get("result") for r in orjson.loads(resp.content)}
+
+        samples = results.get(1) or []
         total_tx = sum(s.get("numTransactions", 0) for s in samples)
         total_sec = sum(s.get("samplePeriodSecs", 1) for s in samples)
         avg_tps = round(total_tx / max(total_sec, 1), 1)
 
-        supply_resp = await client.post(SOLANA_RPC, json={"jsonrpc": "2.0", "id": 2, "method": "getSupply"})
-        supply = supply_resp.json().get("result", {}).get("value", {})
+        supply = (results.get(2) or {}).get("value", {})
 
         return {
             "avg_tps": avg_tps,
@@ -160,30 +210,36 @@ async def get_solana_network(client: httpx.AsyncClient) -> dict:
         return {}
 
 
-async def collect() -> dict[str, Any]:
-    async with httpx.AsyncClient(timeout=30) as client:
-        results = await asyncio.gather(
-            get_tvl_history(client),
-            get_protocols(client),
-            get_fees(client),
-            get_dex_volumes(client),
-            get_stablecoins(client),
-            get_bridge_flows(client),
-            get_solana_network(client),
-            return_exceptions=True,
-        )
-
-    def safe(r, default=None):
-        if default is None:
-            default = {}
-        return r if not isinstance(r, (Exception, BaseException)) else default
+async def _within(budget: float, coro: Awaitable[Any], default: Any) -> Any:
+    """Await a getter under a hard time budget; errors and timeouts yield default."""
+    try:
+        async with asyncio.timeout(budget):
+            return await coro
+    except Exception as e:
+        log.warning(f"DeFi collector task failed: {type(e).__name__}: {e}")
+        return default
+
+
+async def collect(client: httpx.AsyncClient | None = None) -> dict[str, Any]:
+    client = client or get_client()
+    # Each source gets its own budget, so one slow endpoint only costs its own data.
+    # _get enforces a shorter fetch budget inside these, so timeouts still fall back
+    # to the last good response instead of being cancelled from out here.
+    async with asyncio.TaskGroup() as tg:
+        tvl = tg.create_task(_within(_SOURCE_BUDGET, get_tvl_history(client), {}))
+        protocols = tg.create_task(_within(_SOURCE_BUDGET, get_protocols(client), []))
+        fees = tg.create_task(_within(_SOURCE_BUDGET, get_fees(client), []))
+        dex = tg.create_task(_within(_SOURCE_BUDGET, get_dex_volumes(client), {}))
+        stablecoins = tg.create_task(_within(_SOURCE_BUDGET, get_stablecoins(client), {}))
+        bridges = tg.create_task(_within(_SOURCE_BUDGET, get_bridge_flows(client), {}))
+        network = tg.create_task(_within(15, get_solana_network(client), {}))
 
     return {
-        "tvl": safe(results[0]),
-        "protocols": safe(results[1], []),
-        "fees": safe(results[2], []),
-        "dex": safe(results[3]),
-        "stablecoins": safe(results[4]),
-        "bridges": safe(results[5]),
-        "network": safe(results[6]),
+        "tvl": tvl.result(),
+        "protocols": protocols.result(),
+        "fees": fees.result(),
+        "dex": dex.result(),
+        "stablecoins": stablecoins.result(),
+        "bridges": bridges.result(),
+        "network": network.result(),
     }
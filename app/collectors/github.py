@@ -7,17 +7,57 @@ This discovers new projects rather than just tracking known ones.
 
 import asyncio
 import logging
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
 import httpx
+import orjson
 
+from app.collectors.http import get_client, retry_delay
+from app.collectors.ratelimit import AsyncTokenBucket
 from app.config import GITHUB_TOKEN, LOOKBACK_DAYS
 
 log = logging.getLogger(__name__)
 
-# Semaphore to stay within GitHub rate limits
-_sem = asyncio.Semaphore(5)
+def _quota_bucket(quota: int, window: float, burst: int) -> AsyncTokenBucket:
+    """Bucket that never exceeds `quota` requests in any `window` seconds.
+
+    A full bucket releases `burst` at once and then refills at `rate`, so
+    burst + rate * window must stay within the quota.
+    """
+    return AsyncTokenBucket(rate=(quota - burst) / window, burst=burst)
+
+
+# Token buckets shaped to GitHub's published quotas: the search API allows 30 req/min
+# with a token (10 without); GraphQL and the rest of the REST API share the hourly budget
+_buckets = {
+    "search": _quota_bucket(30, 60, burst=10) if GITHUB_TOKEN else _quota_bucket(10, 60, burst=5),
+    "core": _quota_bucket(5000 if GITHUB_TOKEN else 60, 3600, burst=10),
+}
+
+
+def _bucket(url: str) -> AsyncTokenBucket:
+    return _buckets["search" if "/search/" in url else "core"]
+
+
+@dataclass(frozen=True)
+class RunContext:
+    """Search date bounds, computed once per collect run."""
+
+    since_date: str   # start of the lookback window
+    week_ago: str
+    month_start: str
+
+    @classmethod
+    def now(cls) -> "RunContext":
+        now = datetime.now(timezone.utc)
+        return cls(
+            since_date=(now - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d"),
+            week_ago=(now - timedelta(days=7)).strftime("%Y-%m-%d"),
+            month_start=now.replace(day=1).strftime("%Y-%m-%d"),
+        )
 
 
 def _headers() -> dict:
@@ -27,33 +67,78 @@ def _headers() -> dict:
     return h
 
 
+# (url, sorted params) -> (ETag, body); a 304 reply does not count against the rate limit.
+# Query strings embed RunContext dates, so keys roll over daily: keep it a bounded LRU.
+_etag_cache: OrderedDict[tuple, tuple[str, Any]] = OrderedDict()
+_ETAG_CACHE_SIZE = 256
+
+_GH_TRIES = 3
+# Longest rate-limit wait worth sitting out; past this, give up until the next run
+_GH_MAX_RETRY_WAIT = 60
+# (url, sorted params) -> in-flight request, so concurrent duplicates share one GET;
+# entries are removed as soon as the request finishes
+_inflight: dict[tuple, asyncio.Task] = {}
+
+
 async def _gh_get(client: httpx.AsyncClient, url: str, params: dict | None = None) -> Any:
-    """Rate-limited GitHub GET with retry on 403/429."""
-    async with _sem:
-        for attempt in range(3):
-            try:
-                resp = await client.get(url, params=params, headers=_headers())
-                if resp.status_code == 200:
-                    return resp.json()
-                if resp.status_code in (403, 429):
-                    wait = min(2 ** attempt * 5, 30)
-                    remaining = resp.headers.get("X-RateLimit-Remaining", "?")
-                    log.warning(f"GitHub rate limit ({remaining} remaining), retry in {wait}s: {url}")
-                    await asyncio.sleep(wait)
-                    continue
-                log.warning(f"GitHub {resp.status_code} for {url}")
-                return None
-            except Exception as e:
-                log.warning(f"GitHub request failed: {e}")
+    """GitHub GET that coalesces concurrent requests for the same URL and params."""
+    key = (url, tuple(sorted((params or {}).items())))
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_gh_fetch(client, url, params, key))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def _gh_fetch(client: httpx.AsyncClient, url: str, params: dict | None, key: tuple) -> Any:
+    """Rate-limited GitHub GET with retry on 403/429 and ETag revalidation."""
+    cached = _etag_cache.get(key)
+    headers = _headers()
+    if cached:
+        _etag_cache.move_to_end(key)
+        headers["If-None-Match"] = cached[0]
+    for attempt in range(_GH_TRIES):
+        last = attempt == _GH_TRIES - 1
+        try:
+            async with _bucket(url):
+                resp = await client.get(url, params=params, headers=headers)
+            if resp.status_code == 304 and cached:
+                return cached[1]
+            if resp.status_code == 200:
+                data = orjson.loads(resp.content)
+                etag = resp.headers.get("ETag")
+                if etag:
+                    _etag_cache[key] = (etag, data)
+                    _etag_cache.move_to_end(key)
+                    if len(_etag_cache) > _ETAG_CACHE_SIZE:
+                        _etag_cache.popitem(last=False)
+                return data
+            if resp.status_code in (403, 429):
+                remaining = resp.headers.get("X-RateLimit-Remaining", "?")
+                wait = None if last else retry_delay(resp, 2 ** attempt * 5, _GH_MAX_RETRY_WAIT)
+                if wait is None:
+                    log.warning(f"GitHub rate limit ({remaining} remaining), giving up: {url}")
+                    return None
+                log.warning(f"GitHub rate limit ({remaining} remaining), retry in {wait:.0f}s: {url}")
+                await asyncio.sleep(wait)
+                continue
+            if resp.status_code in (502, 503, 504) and not last:
+                await asyncio.sleep(2 ** attempt)
+                continue
+            log.warning(f"GitHub {resp.status_code} for {url}")
+            return None
+        except Exception as e:
+            log.warning(f"GitHub request failed: {e}")
+            if not last:
                 await asyncio.sleep(2)
     return None
 
 
-async def discover_trending_repos(client: httpx.AsyncClient) -> list[dict]:
+async def discover_trending_repos(client: httpx.AsyncClient, ctx: RunContext) -> list[dict]:
     """Find trending Solana repos — sorted by stars, recently active."""
-    since = (datetime.now(timezone.utc) - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
     data = await _gh_get(client, "https://api.github.com/search/repositories", {
-        "q": f"topic:solana pushed:>{since}",
+        "q": f"topic:solana pushed:>{ctx.since_date}",
         "sort": "stars",
         "order": "desc",
         "per_page": 50,
@@ -63,11 +148,10 @@ async def discover_trending_repos(client: httpx.AsyncClient) -> list[dict]:
     return _parse_repos(data.get("items", []))
 
 
-async def discover_new_repos(client: httpx.AsyncClient) -> list[dict]:
+async def discover_new_repos(client: httpx.AsyncClient, ctx: RunContext) -> list[dict]:
     """Find brand-new Solana repos created this month — early signals."""
-    first_of_month = datetime.now(timezone.utc).replace(day=1).strftime("%Y-%m-%d")
     data = await _gh_get(client, "https://api.github.com/search/repositories", {
-        "q": f"topic:solana created:>{first_of_month}",
+        "q": f"topic:solana created:>{ctx.month_start}",
         "sort": "stars",
         "order": "desc",
         "per_page": 30,
@@ -77,11 +161,10 @@ async def discover_new_repos(client: httpx.AsyncClient) -> list[dict]:
     return _parse_repos(data.get("items", []))
 
 
-async def discover_most_active(client: httpx.AsyncClient) -> list[dict]:
+async def discover_most_active(client: httpx.AsyncClient, ctx: RunContext) -> list[dict]:
     """Find most recently updated Solana repos — active development."""
-    since = (datetime.now(timezone.utc) - timedelta(days=7)).strftime("%Y-%m-%d")
     data = await _gh_get(client, "https://api.github.com/search/repositories", {
-        "q": f"topic:solana pushed:>{since} stars:>10",
+        "q": f"topic:solana pushed:>{ctx.week_ago} stars:>10",
         "sort": "updated",
         "order": "desc",
         "per_page": 30,
@@ -91,15 +174,18 @@ async def discover_most_active(client: httpx.AsyncClient) -> list[dict]:
     return _parse_repos(data.get("items", []))
 
 
-async def search_narrative_signal(client: httpx.AsyncClient, query: str) -> dict:
+async def search_narrative_signal(client: httpx.AsyncClient, ctx: RunContext, query: str) -> dict:
     """Search for repos matching a narrative query and return signal strength."""
-    since = (datetime.now(timezone.utc) - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
     data = await _gh_get(client, "https://api.github.com/search/repositories", {
-        "q": f"{query} pushed:>{since}",
+        "q": f"{query} pushed:>{ctx.since_date}",
         "sort": "stars",
         "order": "desc",
         "per_page": 5,
     })
+    return _probe_signal(query, data)
+
+
+def _probe_signal(query: str, data: dict | None) -> dict:
     if not data:
         return {"query": query, "count": 0, "total_stars": 0, "repos": []}
     items = data.get("items", [])
@@ -111,6 +197,71 @@ async def search_narrative_signal(client: httpx.AsyncClient, query: str) -> dict
     }
 
 
+_REPO_FIELDS = """
+  ... on Repository {
+    nameWithOwner description stargazerCount forkCount createdAt updatedAt
+    primaryLanguage { name }
+    repositoryTopics(first: 10) { nodes { topic { name } } }
+    issues(states: OPEN) { totalCount }
+  }
+"""
+
+
+def _graphql_repo(node: dict) -> dict:
+    """Map a GraphQL Repository node onto the REST search item shape."""
+    language = node.get("primaryLanguage") or {}
+    topics = (node.get("repositoryTopics") or {}).get("nodes") or []
+    return {
+        "full_name": node.get("nameWithOwner", ""),
+        "description": node.get("description"),
+        "stargazers_count": node.get("stargazerCount", 0),
+        "forks_count": node.get("forkCount", 0),
+        "language": language.get("name"),
+        "topics": [t["topic"]["name"] for t in topics],
+        "created_at": node.get("createdAt", ""),
+        "updated_at": node.get("updatedAt", ""),
+        "open_issues_count": (node.get("issues") or {}).get("totalCount", 0),
+    }
+
+
+async def gh_graphql_search(client: httpx.AsyncClient, searches: dict[str, tuple[str, int]]) -> dict[str, dict] | None:
+    """Run several repository searches as aliased fields of a single GraphQL request.
+
+    `searches` maps an alias to (search query, result count). Only the fields
+    _parse_repos reads are selected, and each result comes back in the REST
+    search shape ({"total_count", "items"}). GitHub's GraphQL API requires a
+    token; returns None on failure so callers can fall back to REST.
+    """
+    aliases = list(searches)
+    params = ", ".join(f"$q{i}: String!" for i in range(len(aliases)))
+    fields = "\n".join(
+        f"q{i}: search(query: $q{i}, type: REPOSITORY, first: {searches[alias][1]}) "
+        f"{{ repositoryCount nodes {{ {_REPO_FIELDS} }} }}"
+        for i, alias in enumerate(aliases)
+    )
+    payload = {
+        "query": f"query({params}) {{\n{fields}\n}}",
+        "variables": {f"q{i}": searches[alias][0] for i, alias in enumerate(aliases)},
+    }
+    async with _bucket("https://api.github.com/graphql"):
+        try:
+            resp = await client.post("https://api.github.com/graphql", json=payload, headers=_headers())
+            resp.raise_for_status()
+            data = orjson.loads(resp.content).get("data")
+        except Exception as e:
+            log.warning(f"GitHub GraphQL search failed: {e}")
+            return None
+    if not data:
+        return None
+
+    results = {}
+    for i, alias in enumerate(aliases):
+        search = data.get(f"q{i}") or {}
+        items = [_graphql_repo(n) for n in search.get("nodes") or [] if n]
+        results[alias] = {"total_count": search.get("repositoryCount", len(items)), "items": items}
+    return results
+
+
 # Focused narrative probes — 8 high-signal queries to stay within unauthenticated rate limits (60/hr)
 # Total API calls: 3 discovery + 8 probes = 11 (well within limit)
 NARRATIVE_PROBES = [
@@ -125,28 +276,49 @@ NARRATIVE_PROBES = [
 ]
 
 
-async def collect() -> dict[str, Any]:
-    """Main collection — 6 API calls for discovery + 16 for narrative probes = 22 total."""
-    async with httpx.AsyncClient(timeout=20) as client:
+async def collect(client: httpx.AsyncClient | None = None) -> dict[str, Any]:
+    """Main collection — 3 API calls for discovery + 8 for narrative probes = 11 total.
+
+    With a GITHUB_TOKEN the same 11 searches are sent as a single GraphQL request.
+    """
+    client = client or get_client()
+    ctx = RunContext.now()
+
+    # With a token, discovery and probes all go out as one GraphQL request
+    searches = None
+    if GITHUB_TOKEN:
+        searches = await gh_graphql_search(client, {
+            "trending": (f"topic:solana pushed:>{ctx.since_date} sort:stars-desc", 50),
+            "new": (f"topic:solana created:>{ctx.month_start} sort:stars-desc", 30),
+            "active": (f"topic:solana pushed:>{ctx.week_ago} stars:>10 sort:updated-desc", 30),
+            **{q: (f"{q} pushed:>{ctx.since_date} sort:stars-desc", 5) for q in NARRATIVE_PROBES},
+        })
+
+    if searches:
+        trending = _parse_repos(searches["trending"]["items"])
+        new_repos = _parse_repos(searches["new"]["items"])
+        most_active = _parse_repos(searches["active"]["items"])
+        probes = [_probe_signal(q, searches[q]) for q in NARRATIVE_PROBES]
+    else:
         # Phase 1: Open-ended discovery (3 calls)
         trending, new_repos, most_active = await asyncio.gather(
-            discover_trending_repos(client),
-            discover_new_repos(client),
-            discover_most_active(client),
+            discover_trending_repos(client, ctx),
+            discover_new_repos(client, ctx),
+            discover_most_active(client, ctx),
         )
 
-        # Phase 2: Narrative-specific probes (16 calls, throttled)
-        probe_tasks = [search_narrative_signal(client, q) for q in NARRATIVE_PROBES]
+        # Phase 2: Narrative-specific probes (8 calls, throttled)
+        probe_tasks = [search_narrative_signal(client, ctx, q) for q in NARRATIVE_PROBES]
         probe_results = await asyncio.gather(*probe_tasks, return_exceptions=True)
         probes = [r for r in probe_results if isinstance(r, dict)]
 
     # Extract text corpus for narrative discovery
     all_repos = {r["name"]: r for r in trending + new_repos + most_active}
-    text_corpus = []
-    for r in all_repos.values():
-        text = f"{r.get('description', '')} {' '.join(r.get('topics', []))}"
-        if text.strip():
-            text_corpus.append(text.lower())
+    text_corpus = [
+        text.lower()
+        for r in all_repos.values()
+        if (text := f"{r.get('description', '')} {' '.join(r.get('topics', []))}").strip()
+    ]
 
     rate_info = "authenticated" if GITHUB_TOKEN else "unauthenticated (60 req/hr)"
     log.info(f"GitHub: {len(all_repos)} unique repos, {len(probes)} probes, mode={rate_info}")
@@ -165,7 +337,7 @@ def _parse_repos(items: list[dict]) -> list[dict]:
     return [
         {
             "name": r.get("full_name", ""),
-            "description": r.get("description", "") or "",
+            "description": r.get("description") or "",
             "stars": r.get("stargazers_count", 0),
             "forks": r.get("forks_count", 0),
             "language": r.get("language"),
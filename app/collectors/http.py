@@ -0,0 +1,123 @@
+"""Shared HTTP client for all collectors.
+
+One pooled HTTP/2 client is reused across collectors and pipeline runs, so
+keep-alive connections to GitHub, DeFiLlama, Reddit, etc. survive between
+refreshes instead of paying a fresh TCP/TLS handshake per collector per run.
+get_with_retry() adds per-host concurrency limits and retry with backoff on top.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+log = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+
+# Bound concurrent requests per upstream host
+_host_sems: defaultdict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(8))
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# Collectors run under per-source time budgets, so never sleep long between retries
+MAX_RETRY_WAIT = 10
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the process-wide client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            # Fail fast on dead hosts; endpoints with large bodies override the read timeout
+            timeout=httpx.Timeout(10.0, connect=3.0, write=5.0, pool=5.0),
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client (called on application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# X-RateLimit-Reset values below this are seconds-until-reset (Reddit); above it, unix time (GitHub)
+_EPOCH_THRESHOLD = 1_000_000_000
+
+
+def _header_float(resp: httpx.Response, name: str) -> float | None:
+    try:
+        return float(resp.headers[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def retry_after_seconds(resp: httpx.Response) -> float | None:
+    """Seconds the server asked us to wait, or None if it did not say.
+
+    Reads Retry-After, then X-RateLimit-Reset, the latter only once
+    X-RateLimit-Remaining reports the quota as exhausted.
+    """
+    retry_after = _header_float(resp, "Retry-After")
+    if retry_after is not None:
+        return max(0.0, retry_after)
+    reset = _header_float(resp, "X-RateLimit-Reset")
+    remaining = _header_float(resp, "X-RateLimit-Remaining")
+    if reset is None or remaining is None or remaining > 0:
+        return None
+    if reset >= _EPOCH_THRESHOLD:
+        reset -= time.time()
+    return max(0.0, reset)
+
+
+def retry_delay(resp: httpx.Response | None, fallback: float, cap: float) -> float | None:
+    """Seconds to wait before retrying, or None to give up.
+
+    Uses the server's requested wait when it gives one, else `fallback`. If the
+    server asks for longer than `cap`, retrying would only hit the same limit.
+    """
+    delay = retry_after_seconds(resp) if resp is not None else None
+    if not delay:
+        return min(fallback, cap)
+    if delay > cap:
+        return None
+    return delay
+
+
+def _backoff(attempt: int) -> float:
+    return min(MAX_RETRY_WAIT, 0.5 * 2 ** attempt) + random.random() * 0.5
+
+
+async def get_with_retry(client: httpx.AsyncClient, url: str, *, max_tries: int = 4, **kwargs) -> httpx.Response:
+    """GET with per-host concurrency limit, retrying transport errors and 429/5xx.
+
+    Returns the last response (which may still be an error status); raises the
+    last transport error if every attempt failed to connect.
+    """
+    sem = _host_sems[httpx.URL(url).host]
+    for attempt in range(max_tries):
+        resp = None
+        try:
+            async with sem:
+                resp = await client.get(url, **kwargs)
+            if resp.status_code not in RETRY_STATUSES:
+                return resp
+        except httpx.TransportError:
+            if attempt == max_tries - 1:
+                raise
+        if attempt < max_tries - 1:
+            delay = retry_delay(resp, _backoff(attempt), MAX_RETRY_WAIT)
+            if delay is None:
+                # The host wants us gone for longer than our budget allows; stop asking
+                log.warning(f"Giving up on {url}: rate limited for {retry_after_seconds(resp):.0f}s")
+                return resp
+            log.warning(f"Retrying {url} in {delay:.1f}s ({resp.status_code if resp else 'transport error'})")
+            await asyncio.sleep(delay)
+    return resp
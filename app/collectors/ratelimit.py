@@ -0,0 +1,37 @@
+"""Async token-bucket rate limiting for upstream APIs."""
+
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """Token bucket: `burst` requests up front, then a steady `rate` per second.
+
+    Use as `async with bucket:` around a request; callers wait for a token
+    instead of firing and getting rate-limited.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._tokens = 1.0
+                self._updated = time.monotonic()
+            self._tokens -= 1
+
+    async def __aenter__(self) -> "AsyncTokenBucket":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
@@ -11,9 +11,13 @@ import asyncio
 import logging
 import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
+from itertools import chain
 from typing import Any
 
 import httpx
+import orjson
+
+from app.collectors.http import get_client, get_with_retry
 
 log = logging.getLogger(__name__)
 
@@ -21,7 +25,8 @@ log = logging.getLogger(__name__)
 async def get_reddit_hot(client: httpx.AsyncClient, subreddit: str, limit: int = 25) -> list[dict]:
     """Fetch hot posts from a subreddit — free, no auth needed."""
     try:
-        resp = await client.get(
+        resp = await get_with_retry(
+            client,
             f"https://www.reddit.com/r/{subreddit}/hot.json",
             params={"limit": limit, "raw_json": 1},
             headers={"User-Agent": "Mozilla/5.0 (compatible; SolanaNarrativeBot/1.0; research)"},
@@ -29,7 +34,7 @@ async def get_reddit_hot(client: httpx.AsyncClient, subreddit: str, limit: int =
         if resp.status_code != 200:
             log.warning(f"Reddit r/{subreddit}: {resp.status_code}")
             return []
-        posts = resp.json().get("data", {}).get("children", [])
+        posts = orjson.loads(resp.content).get("data", {}).get("children", [])
         return [
             {
                 "title": p["data"].get("title", ""),
@@ -51,13 +56,14 @@ async def get_reddit_hot(client: httpx.AsyncClient, subreddit: str, limit: int =
 async def get_stackexchange_hot(client: httpx.AsyncClient) -> list[dict]:
     """Fetch trending Solana StackExchange questions — developer signal."""
     try:
-        resp = await client.get(
+        resp = await get_with_retry(
+            client,
             "https://api.stackexchange.com/2.3/questions",
             params={"order": "desc", "sort": "hot", "site": "solana", "pagesize": 20, "filter": "default"},
         )
         if resp.status_code != 200:
             return []
-        items = resp.json().get("items", [])
+        items = orjson.loads(resp.content).get("items", [])
         return [
             {
                 "title": q.get("title", ""),
@@ -75,68 +81,79 @@ async def get_stackexchange_hot(client: httpx.AsyncClient) -> list[dict]:
         return []
 
 
-async def get_rss_feed(client: httpx.AsyncClient, url: str, source_name: str) -> list[dict]:
-    """Parse an RSS feed for recent items."""
+async def get_rss_feed(client: httpx.AsyncClient, url: str, source_name: str, limit: int = 15) -> list[dict]:
+    """Stream-parse an RSS feed, stopping once `limit` items have been read."""
+    items = []
     try:
-        resp = await client.get(url, timeout=10)
-        if resp.status_code != 200:
-            return []
-        root = ET.fromstring(resp.text)
-        items = []
-        for item in root.findall(".//item")[:15]:
-            items.append({
-                "title": item.findtext("title", ""),
-                "link": item.findtext("link", ""),
-                "date": item.findtext("pubDate", ""),
-                "source": source_name,
-            })
+        async with client.stream("GET", url, timeout=httpx.Timeout(8.0, connect=3.0)) as resp:
+            if resp.status_code != 200:
+                return []
+            # Feed raw bytes (the XML declaration carries the encoding) as they arrive
+            parser = ET.XMLPullParser(events=("end",))
+            async for chunk in resp.aiter_bytes():
+                parser.feed(chunk)
+                for _, elem in parser.read_events():
+                    if elem.tag != "item":
+                        continue
+                    items.append({
+                        "title": elem.findtext("title", ""),
+                        "link": elem.findtext("link", ""),
+                        "date": elem.findtext("pubDate", ""),
+                        "source": source_name,
+                    })
+                    elem.clear()
+                    if len(items) >= limit:
+                        return items
         return items
     except Exception as e:
         log.warning(f"RSS {source_name} failed: {e}")
         return []
 
 
-async def collect() -> dict[str, Any]:
-    async with httpx.AsyncClient(timeout=15, follow_redirects=True) as client:
-        results = await asyncio.gather(
-            get_reddit_hot(client, "solana", 30),
-            get_reddit_hot(client, "solanadev", 20),
-            get_stackexchange_hot(client),
-            get_rss_feed(client, "https://solana.com/news/rss.xml", "Solana Blog"),
-            get_rss_feed(client, "https://forum.solana.com/latest.rss", "Solana Forum"),
-            return_exceptions=True,
-        )
-
-    def safe(r, default=None):
-        if default is None:
-            default = []
-        return r if not isinstance(r, (Exception, BaseException)) else default
-
-    reddit_solana = safe(results[0])
-    reddit_dev = safe(results[1])
-    stackexchange = safe(results[2])
-    blog = safe(results[3])
-    forum = safe(results[4])
+# Output key -> (source name, feed URL); all feeds are fetched concurrently
+RSS_FEEDS = {
+    "blog": ("Solana Blog", "https://solana.com/news/rss.xml"),
+    "forum": ("Solana Forum", "https://forum.solana.com/latest.rss"),
+}
+
+
+async def collect(client: httpx.AsyncClient | None = None) -> dict[str, Any]:
+    client = client or get_client()
+    results = await asyncio.gather(
+        get_reddit_hot(client, "solana", 30),
+        get_reddit_hot(client, "solanadev", 20),
+        get_stackexchange_hot(client),
+        *(get_rss_feed(client, url, name) for name, url in RSS_FEEDS.values()),
+        return_exceptions=True,
+    )
+
+    # Every source degrades to an empty list, but say which one failed and why
+    sources = ("reddit r/solana", "reddit r/solanadev", "stackexchange", *RSS_FEEDS)
+    for source, r in zip(sources, results):
+        if isinstance(r, BaseException):
+            log.warning(f"Social source {source} failed: {type(r).__name__}: {r}")
+    reddit_solana, reddit_dev, stackexchange, *feed_items = (
+        [] if isinstance(r, BaseException) else r for r in results
+    )
+    feeds = dict(zip(RSS_FEEDS, feed_items))
 
     # Build text corpus for narrative discovery
-    text_corpus = []
-    for post in reddit_solana + reddit_dev:
-        if post.get("title"):
-            text_corpus.append(post["title"].lower())
-    for q in stackexchange:
-        if q.get("title"):
-            text_corpus.append(q["title"].lower())
-        text_corpus.extend(t.lower() for t in q.get("tags", []))
-    for item in blog + forum:
-        if item.get("title"):
-            text_corpus.append(item["title"].lower())
-
-    log.info(f"Social: {len(reddit_solana)} reddit, {len(reddit_dev)} dev, {len(stackexchange)} SE, {len(blog)} blog, {len(forum)} forum")
+    text_corpus = [
+        t.lower()
+        for t in chain(
+            (post.get("title") for post in reddit_solana + reddit_dev),
+            (t for q in stackexchange for t in (q.get("title"), *q.get("tags", []))),
+            (item.get("title") for item in chain.from_iterable(feeds.values())),
+        )
+        if t
+    ]
+
+    feed_counts = ", ".join(f"{len(items)} {key}" for key, items in feeds.items())
+    log.info(f"Social: {len(reddit_solana)} reddit, {len(reddit_dev)} dev, {len(stackexchange)} SE, {feed_counts}")
 
     return {
         "reddit": {"solana": reddit_solana, "solanadev": reddit_dev},
         "stackexchange": stackexchange,
-        "blog": blog,
-        "forum": forum,
+        **feeds,
         "text_corpus": text_corpus,
     }
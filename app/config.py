@@ -15,3 +15,10 @@ LOOKBACK_DAYS = 14
 
 # Cache TTL
 CACHE_TTL_SECONDS = 3600  # 1 hour — data sources update hourly at most
+# Past the TTL, cached results are still served for this long while one background refresh runs
+CACHE_STALE_SECONDS = 6 * CACHE_TTL_SECONDS
+# Last pipeline result, persisted so restarts serve it instead of starting cold
+CACHE_FILE = DATA_DIR / "pipeline_cache.json"
+
+# Upstream API response cache — DeFiLlama endpoints refresh hourly at most
+UPSTREAM_CACHE_TTL_SECONDS = 900
@@ -1,49 +1,142 @@
 """Solana Narrative Detector — FastAPI application."""
 
 import asyncio
+import heapq
 import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
 
+import orjson
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
 
 from app.collectors import github, defi, social
-from app.analysis.engine import (
-    extract_github_signals,
-    extract_defi_signals,
-    extract_social_signals,
-    discover_narratives,
-    generate_ideas,
-)
-from app.analysis.snapshots import save_snapshot, load_previous_snapshot, compute_deltas
-from app.config import BASE_DIR, CACHE_TTL_SECONDS
+from app.collectors.http import get_client, close_client
+from app.analysis.engine import extract_all_signals, discover_narratives, generate_ideas
+from app.analysis.snapshots import save_snapshot, load_previous_snapshot, compute_deltas, apply_deltas
+from app.config import BASE_DIR, CACHE_FILE, CACHE_STALE_SECONDS, CACHE_TTL_SECONDS
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
 log = logging.getLogger(__name__)
 
-app = FastAPI(title="Solana Narrative Detector", version="2.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _load_persisted_cache()
+    yield
+    await close_client()
+
+
+app = FastAPI(title="Solana Narrative Detector", version="2.0.0", lifespan=lifespan)
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 
-_cache: dict = {}
-_cache_time: datetime | None = None
+API_PAYLOAD_KEYS = {
+    "narratives": ("generated_at", "narratives", "ideas", "deltas"),
+    "signals": ("generated_at", "stats", "github", "defi", "social"),
+}
 
 
-async def run_pipeline(force: bool = False) -> dict:
-    global _cache, _cache_time
+@dataclass
+class PipelineCache:
+    """Single owner of cached pipeline results and their stale-while-revalidate state."""
 
-    now = datetime.now(timezone.utc)
-    if not force and _cache and _cache_time and (now - _cache_time).total_seconds() < CACHE_TTL_SECONDS:
-        return _cache
+    result: dict = field(default_factory=dict)
+    fresh_until: float = 0.0  # monotonic deadlines: serve as-is until fresh, serve + revalidate until stale
+    stale_until: float = 0.0
+    refresh_task: asyncio.Task | None = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    api_bodies: dict[str, bytes] = field(default_factory=dict)  # endpoint -> pre-serialized JSON
+
+    def is_fresh(self) -> bool:
+        return bool(self.result) and time.monotonic() < self.fresh_until
+
+    def store(self, result: dict, age: float = 0.0) -> None:
+        """Cache a result that is `age` seconds old."""
+        self.result = result
+        # Serialize each API payload once per refresh instead of once per request
+        self.api_bodies = {
+            name: orjson.dumps({k: result[k] for k in keys}, option=orjson.OPT_NON_STR_KEYS)
+            for name, keys in API_PAYLOAD_KEYS.items()
+        }
+        self.fresh_until = time.monotonic() - age + CACHE_TTL_SECONDS
+        self.stale_until = self.fresh_until + CACHE_STALE_SECONDS
+
+
+_cache = PipelineCache()
 
+
+def _load_persisted_cache() -> None:
+    """Warm-start from the last persisted result, aged by the file's mtime."""
+    try:
+        age = time.time() - CACHE_FILE.stat().st_mtime
+        if age < CACHE_TTL_SECONDS + CACHE_STALE_SECONDS:
+            _cache.store(orjson.loads(CACHE_FILE.read_bytes()), age=age)
+            log.info(f"Loaded cached pipeline result ({age:.0f}s old)")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log.warning(f"Ignoring unreadable pipeline cache: {e}")
+
+
+def _persist_cache(result: dict) -> None:
+    """Write the result atomically: write a temp file, then rename over the old one."""
+    try:
+        tmp = CACHE_FILE.with_suffix(".tmp")
+        tmp.write_bytes(orjson.dumps(result, option=orjson.OPT_NON_STR_KEYS))
+        tmp.replace(CACHE_FILE)
+    except Exception as e:
+        log.warning(f"Failed to persist pipeline cache: {e}")
+
+
+async def run_pipeline(force: bool = False) -> dict:
+    """Return pipeline results, stale-while-revalidate.
+
+    Fresh results are returned as-is. Stale results are returned immediately
+    while a single background task rebuilds them. Only a cold or expired
+    cache (or force=True) makes the caller wait for a rebuild.
+    """
+    if not force and _cache.result:
+        now = time.monotonic()
+        if now < _cache.fresh_until:
+            return _cache.result
+        if now < _cache.stale_until:
+            if _cache.refresh_task is None or _cache.refresh_task.done():
+                _cache.refresh_task = asyncio.create_task(_background_refresh())
+            return _cache.result
+
+    async with _cache.lock:
+        # Another caller may have finished a rebuild while we waited
+        if not force and _cache.is_fresh():
+            return _cache.result
+        return await _rebuild()
+
+
+async def _background_refresh(force: bool = False) -> None:
+    try:
+        async with _cache.lock:
+            if force or not _cache.is_fresh():
+                await _rebuild()
+    except Exception as e:
+        log.error(f"Background refresh failed, serving stale results: {e}")
+        # Back off for a minute rather than retrying on every request
+        _cache.fresh_until = time.monotonic() + 60
+        _cache.stale_until = max(_cache.stale_until, _cache.fresh_until)
+
+
+async def _rebuild() -> dict:
+    now = datetime.now(timezone.utc)
     log.info("Starting data collection pipeline...")
 
     # Collect from all sources in parallel
+    client = get_client()
     github_data, defi_data, social_data = await asyncio.gather(
-        github.collect(),
-        defi.collect(),
-        social.collect(),
+        github.collect(client),
+        defi.collect(client),
+        social.collect(client),
         return_exceptions=True,
     )
 
@@ -58,11 +151,8 @@ async def run_pipeline(force: bool = False) -> dict:
         log.error(f"Social collection failed: {social_data}")
         social_data = {}
 
-    # Extract signals from each source
-    github_signals = extract_github_signals(github_data)
-    defi_signals = extract_defi_signals(defi_data)
-    social_signals = extract_social_signals(social_data)
-    all_signals = github_signals + defi_signals + social_signals
+    # Extract signals from each source — CPU-bound, so keep it off the event loop
+    all_signals = await asyncio.to_thread(extract_all_signals, github_data, defi_data, social_data)
 
     # Build merged text corpus for narrative discovery
     text_corpus = github_data.get("text_corpus", []) + social_data.get("text_corpus", [])
@@ -78,12 +168,8 @@ async def run_pipeline(force: bool = False) -> dict:
     previous = load_previous_snapshot()
     deltas = compute_deltas(narratives, previous)
 
-    # Attach deltas to narratives
-    delta_map = {d["name"]: d for d in deltas}
-    for n in narratives:
-        d = delta_map.get(n["name"], {})
-        n["delta"] = d.get("delta", "new")
-        n["score_change"] = d.get("score_change", 0)
+    # Attach deltas to narratives — once per refresh, before the result is cached
+    apply_deltas(narratives, deltas)
 
     result = {
         "generated_at": now.isoformat(),
@@ -116,17 +202,16 @@ async def run_pipeline(force: bool = False) -> dict:
             "network": defi_data.get("network", {}),
         },
         "social": {
-            "reddit_top": sorted(
-                social_data.get("reddit", {}).get("solana", []),
-                key=lambda p: p.get("score", 0), reverse=True,
-            )[:5],
+            "reddit_top": heapq.nlargest(
+                5, social_data.get("reddit", {}).get("solana", []), key=lambda p: p.get("score", 0),
+            ),
             "se_top": social_data.get("stackexchange", [])[:5],
             "forum": social_data.get("forum", [])[:5],
         },
     }
 
-    _cache = result
-    _cache_time = now
+    _cache.store(result)
+    _persist_cache(result)
     log.info(f"Pipeline complete: {len(narratives)} narratives, {len(ideas)} ideas from {len(all_signals)} signals")
     return result
 
@@ -139,20 +224,25 @@ async def dashboard(request: Request):
 
 @app.get("/api/narratives")
 async def api_narratives():
-    data = await run_pipeline()
-    return {"generated_at": data["generated_at"], "narratives": data["narratives"], "ideas": data["ideas"], "deltas": data["deltas"]}
+    await run_pipeline()
+    return Response(content=_cache.api_bodies["narratives"], media_type="application/json")
 
 
 @app.get("/api/signals")
 async def api_signals():
-    data = await run_pipeline()
-    return {"generated_at": data["generated_at"], "stats": data["stats"], "github": data["github"], "defi": data["defi"], "social": data["social"]}
+    await run_pipeline()
+    return Response(content=_cache.api_bodies["signals"], media_type="application/json")
 
 
 @app.post("/api/refresh")
-async def api_refresh():
-    data = await run_pipeline(force=True)
-    return {"status": "refreshed", "generated_at": data["generated_at"], "narratives_count": len(data["narratives"])}
+async def api_refresh(wait: bool = False):
+    """Schedule a refresh and return immediately; pass ?wait=1 to block until it finishes."""
+    if wait:
+        data = await run_pipeline(force=True)
+        return {"status": "refreshed", "generated_at": data["generated_at"], "narratives_count": len(data["narratives"])}
+    if _cache.refresh_task is None or _cache.refresh_task.done():
+        _cache.refresh_task = asyncio.create_task(_background_refresh(force=True))
+    return {"status": "refresh_scheduled", "previous_generated_at": _cache.result.get("generated_at")}
 
 
 @app.get("/health")